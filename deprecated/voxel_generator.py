@@ -69,22 +69,21 @@ class VoxelImageGenerator:
     def __next__(self) -> tuple[torch.Tensor, torch.Tensor]:
         surfaces, features = next(self._surface_generator_iter)
 
-        surfaces = torch.tile(
-            surfaces.reshape(
-                (
-                    self.config.batch_size,
-                    self.config.resolution.phi,
-                    self.config.resolution.Nw,
-                    1,
-                )
-            ),
-            (1, 1, 1, self.config.resolution.eta_sp),
+        # The trailing axis of size 1 broadcasts against grid_values, so the
+        # surfaces never need to be tiled along eta_sp
+        surfaces = surfaces.reshape(
+            (
+                self.config.batch_size,
+                self.config.resolution.phi,
+                self.config.resolution.Nw,
+                1,
+            )
         )
 
         # if <= or >=, we would include capped values, which we don't want
         image = torch.logical_and(
-            surfaces[:, :-1, :-1, :-1] < self.grid_values[1:],
-            surfaces[:, 1:, 1:, 1:] > self.grid_values[:-1],
-        ).to(dtype=torch.float, device=self.config.device)
+            surfaces[:, :-1, :-1] < self.grid_values[1:],
+            surfaces[:, 1:, 1:] > self.grid_values[:-1],
+        ).to(dtype=torch.uint8, device=self.config.device)
 
         return image, features
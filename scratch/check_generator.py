@@ -1,6 +1,6 @@
 import collections
+from math import log10
 
-import numpy as np
 import torch
 
 device = torch.device("cpu")
@@ -98,14 +98,18 @@ def mike_viscosity(
 
 
 def main():
-    phi = torch.tensor(
-        np.geomspace(PHI.min, PHI.max, 224, endpoint=True),
+    phi = torch.logspace(
+        log10(PHI.min),
+        log10(PHI.max),
+        224,
         dtype=torch.float,
         device=device,
     ).reshape(1, 224, 1)
 
-    nw = torch.tensor(
-        np.geomspace(NW.min, NW.max, 224, endpoint=True),
+    nw = torch.logspace(
+        log10(NW.min),
+        log10(NW.max),
+        224,
         dtype=torch.float,
         device=device,
     ).reshape(1, 1, 224)
@@ -0,0 +1,211 @@
+from math import log10
+from pathlib import Path
+
+import pytest
+import torch
+
+import psst
+
+
+EXAMPLE_CONFIG = Path(__file__).parents[1] / "examples" / "train" / "config.yaml"
+
+
+@pytest.fixture
+def generator_config() -> psst.GeneratorConfig:
+    return psst.loadConfig(EXAMPLE_CONFIG).generator_config
+
+
+@pytest.mark.parametrize("parameter", ["Bg", "Bth"])
+def test_example_config_batch(generator_config: psst.GeneratorConfig, parameter: str):
+    config = generator_config._replace(parameter=parameter)
+    generator = psst.SampleGenerator(**config._asdict())
+
+    visc, bg, bth, pe = next(iter(generator(1)))
+
+    batch_size = config.batch_size
+    assert visc.shape == (batch_size, config.phi_range.num, config.nw_range.num)
+    assert bg.shape == (batch_size,)
+    assert bth.shape == (batch_size,)
+    assert pe.shape == (batch_size,)
+    assert not torch.isnan(visc).any()
+
+
+# (Bg, Bth, Pe) triples within the ranges of the example config
+FIXED_PARAMETERS = torch.tensor(
+    [
+        [0.5, 0.3, 4.0],
+        [0.9, 0.8, 6.5],
+        [1.2, 0.6, 10.0],
+    ]
+)
+
+
+def closed_form_eta_sp(
+    regime: str,
+    Bg: torch.Tensor,
+    Bth: torch.Tensor,
+    Pe: torch.Tensor,
+    phi: torch.Tensor,
+    Nw: torch.Tensor,
+) -> torch.Tensor:
+    """Specific viscosity as written in theory/derivations.md, evaluated in float64."""
+    if regime == "combo":
+        # Equations 9, 12, and 13 (general case)
+        g = torch.minimum(Bg ** (3 / 0.764) * phi ** (-1 / 0.764), Bth**6 * phi**-2)
+        Ne = Pe**2 * torch.minimum(
+            Bg ** (0.056 / (0.528 * 0.764))
+            * Bth ** (0.944 / 0.528)
+            * phi ** (-1 / 0.764),
+            torch.minimum(Bth**2 * phi ** (-4 / 3), Bth**6 * phi**-2),
+        )
+        return Nw * (1 + (Nw / Ne) ** 2) * torch.minimum(1 / g, phi * Bth**-2)
+    if regime == "bg":
+        # Athermal solvent, c <= c**
+        g = (Bg**3 / phi) ** (1 / 0.764)
+        Ne = Pe**2 * g
+        return Nw * (1 + (Nw / Ne) ** 2) / g
+    # Theta solvent
+    g = Bth**6 / phi**2
+    Ne = Pe**2 * torch.minimum(Bth**2 * phi ** (-4 / 3), Bth**6 * phi**-2)
+    return Nw * (1 + (Nw / Ne) ** 2) * torch.minimum(1 / g, phi * Bth**-2)
+
+
+@pytest.mark.parametrize("regime", ["combo", "bg", "bth"])
+def test_samples_match_closed_form(generator_config: psst.GeneratorConfig, regime: str):
+    generator = psst.SampleGenerator(**generator_config._asdict())
+    Bg, Bth, Pe = FIXED_PARAMETERS.T.reshape(3, -1, 1, 1)
+
+    samples = getattr(generator, f"_get_{regime}_samples")(Bg, Bth, Pe)
+    expected = closed_form_eta_sp(
+        regime,
+        Bg.double(),
+        Bth.double(),
+        Pe.double(),
+        generator.phi.double(),
+        generator.nw.double(),
+    )
+
+    torch.testing.assert_close(samples.double(), expected, rtol=1e-5, atol=0.0)
+
+
+def test_reduced_precision_labels(generator_config: psst.GeneratorConfig):
+    generator = psst.SampleGenerator(
+        **generator_config._asdict(), compute_dtype=torch.bfloat16
+    )
+    inputs = []
+    labels = []
+
+    def record(sample_function):
+        def recorded(Bg: torch.Tensor, Bth: torch.Tensor, Pe: torch.Tensor):
+            inputs.append((Bg, Bth, Pe))
+            # Labels as stored when the samples are computed, before normalization
+            labels.append(
+                (generator.bg.clone(), generator.bth.clone(), generator.pe.clone())
+            )
+            return sample_function(Bg, Bth, Pe)
+
+        return recorded
+
+    generator._get_combo_samples = record(generator._get_combo_samples)
+    generator._get_single_samples = record(generator._get_single_samples)
+    visc, *_ = next(iter(generator(1)))
+
+    assert visc.dtype == torch.float32
+    assert len(inputs) == 2
+    for combo_label, single_label in zip(*labels):
+        torch.testing.assert_close(combo_label, single_label, rtol=0.0, atol=0.0)
+
+    # The combo and single samples split the batch, so together their inputs are a
+    # permutation of the stored labels
+    for combo_values, single_values, label in zip(*inputs, labels[0]):
+        assert combo_values.dtype == torch.bfloat16
+        assert single_values.dtype == torch.bfloat16
+        values = torch.cat((combo_values, single_values)).float().flatten()
+        torch.testing.assert_close(
+            values.sort().values, label.flatten().sort().values, rtol=0.0, atol=0.0
+        )
+
+
+@pytest.fixture
+def non_square_config(generator_config: psst.GeneratorConfig) -> psst.GeneratorConfig:
+    return generator_config._replace(
+        batch_size=16,
+        phi_range=psst.Range(3e-5, 0.02, num=96, log_scale=True),
+        nw_range=psst.Range(100, 1e5, num=64, log_scale=True),
+    )
+
+
+def test_trim_non_square(non_square_config: psst.GeneratorConfig):
+    generator = psst.SampleGenerator(
+        **non_square_config._asdict(), generator=torch.Generator().manual_seed(0)
+    )
+    max_num_rows_select = 12
+    num_concentrations_per_sample = 65
+
+    # Every entry of the rows in [10, 80] is nonzero, so only phi trimming can
+    # remove those rows, and it may only pick from [10, 80)
+    samples = torch.rand(16, 96, 64) + 0.1
+    samples[:, :10] = 0.0
+    samples[:, 81:] = 0.0
+    trimmed = generator._trim(
+        samples.clone(),
+        max_num_rows_select=max_num_rows_select,
+        num_concentrations_per_sample=num_concentrations_per_sample,
+    )
+
+    num_nw_kept = torch.any(trimmed != 0, dim=1).sum(dim=1)
+    assert torch.all(num_nw_kept >= 1)
+    assert torch.all(num_nw_kept <= max_num_rows_select)
+
+    removed = torch.any(samples != 0, dim=2) & ~torch.any(trimmed != 0, dim=2)
+    num_phi_removed = removed.sum(dim=1)
+    assert torch.all(num_phi_removed >= 1)
+    assert torch.all(num_phi_removed <= num_concentrations_per_sample)
+    removed_rows = removed.nonzero()[:, 1]
+    assert torch.all(removed_rows >= 10)
+    assert torch.all(removed_rows < 80)
+
+    visc, *_ = next(iter(generator(1)))
+    assert visc.shape == (16, 96, 64)
+
+
+def test_seeded_batches_reproducible(non_square_config: psst.GeneratorConfig):
+    batches = []
+    for global_seed in (1, 2):
+        torch.manual_seed(global_seed)
+        generator = psst.SampleGenerator(
+            **non_square_config._asdict(), generator=torch.Generator().manual_seed(3)
+        )
+        batches.append(next(iter(generator(1))))
+
+    for first, second in zip(*batches):
+        torch.testing.assert_close(first, second, rtol=0.0, atol=0.0)
+
+
+def test_axes(non_square_config: psst.GeneratorConfig):
+    generator = psst.SampleGenerator(**non_square_config._asdict())
+
+    expected_phi = torch.logspace(log10(3e-5), log10(0.02), 96)
+    expected_nw = torch.logspace(log10(100), log10(1e5), 64)
+    torch.testing.assert_close(generator.phi, expected_phi.reshape(1, -1, 1))
+    torch.testing.assert_close(generator.nw, expected_nw.reshape(1, 1, -1))
+
+
+def test_unseeded_batches_differ(non_square_config: psst.GeneratorConfig):
+    first = psst.SampleGenerator(**non_square_config._asdict())
+    second = psst.SampleGenerator(**non_square_config._asdict())
+
+    first_visc, *first_values = next(iter(first(1)))
+    second_visc, *second_values = next(iter(second(1)))
+
+    assert not torch.equal(first_visc, second_visc)
+    for first_value, second_value in zip(first_values, second_values):
+        assert not torch.equal(first_value, second_value)
+
+
+@pytest.mark.parametrize("compute_dtype", [torch.float16, torch.int32])
+def test_unsupported_compute_dtype(
+    generator_config: psst.GeneratorConfig, compute_dtype: torch.dtype
+):
+    with pytest.raises(ValueError):
+        psst.SampleGenerator(**generator_config._asdict(), compute_dtype=compute_dtype)